@@ -1,4 +1,5 @@
 from __future__ import annotations
+import threading
 from pathlib import Path
 from typing import Dict, List, Optional
 from fastapi import APIRouter, HTTPException, Request
@@ -22,15 +23,22 @@ from ..models.schemas import (
     BattleResponse,
     ChatRequest,
     ChatResponse,
+    EstimateRequest,
+    EstimateResponse,
 )
 from ..services.chat_service import ChatService
+from ..services.judge_service import BattlePair, JudgeService
+from ..services.latency_model import LatencyPredictor
 from ..services.ollama_client import OllamaClient
+from ..services.scheduler import Scheduler
+from ..core.config import settings
 
 # -----------------------------------------------------------------------------
 # Setup
 # -----------------------------------------------------------------------------
 BASE_DIR = Path(__file__).resolve().parents[1]
 TEMPLATES_DIR = BASE_DIR / "templates"
+HISTORY_CSV = BASE_DIR / "data" / "llm_runs.csv"
 
 router = APIRouter()
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
@@ -39,6 +47,36 @@ service = ChatService()
 client = OllamaClient()
 
 
+def _load_history() -> List[dict]:
+    """Logged runs for fitting the latency model: the store first, then the local CSV."""
+    try:
+        return store.read_rows()
+    except Exception as e:
+        print(f"[routes] history from {_STORE_NAME} unavailable: {e}")
+    if HISTORY_CSV.exists():
+        import csv
+
+        with HISTORY_CSV.open(newline="", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+    return []
+
+
+predictor = LatencyPredictor(history_loader=_load_history)
+scheduler = Scheduler()
+
+# Created on first use so the judge pool and verdict cache cost nothing unless JUDGE_ONLINE is set.
+_judge: Optional[JudgeService] = None
+_judge_lock = threading.Lock()
+
+
+def _get_judge() -> JudgeService:
+    global _judge
+    with _judge_lock:
+        if _judge is None:
+            _judge = JudgeService(client=client, scheduler=scheduler, predictor=predictor)
+        return _judge
+
+
 def _log_safe(*args, **kwargs) -> None:
     """Log to the configured store without ever failing the API call."""
     try:
@@ -73,6 +111,36 @@ def healthz() -> Dict[str, str]:
     }
 
 
+@router.get("/api/latency", tags=["utils"])
+def latency_stats() -> Dict[str, object]:
+    """Fitted per-model latency parameters, prediction error and queue state."""
+    return {"queue": scheduler.status(), "models": predictor.stats()}
+
+
+@router.get("/api/judge", tags=["utils"])
+def judge_stats() -> Dict[str, object]:
+    """Judge throughput (pairs/sec) and cache usage for this process."""
+    return {"online": settings.judge_online, **(_judge.stats() if _judge else {})}
+
+
+@router.post("/api/estimate", response_model=EstimateResponse, tags=["utils"])
+def estimate(req: EstimateRequest) -> EstimateResponse:
+    """Predicted run time and ETA for a prompt, before it is submitted."""
+    if req.mode == "battle":
+        if not (req.model_a and req.model_b):
+            raise HTTPException(status_code=422, detail="model_a and model_b are required")
+        preds = [predictor.predict(req.prompt, m) for m in (req.model_a, req.model_b)]
+    else:
+        preds = [predictor.predict(req.prompt, req.model)]
+    total = round(sum(p.total_sec for p in preds), 3)
+    return EstimateResponse(
+        predicted_time_sec=total,
+        eta_sec=scheduler.eta(total),
+        queue=scheduler.status(),
+        models=[{**vars(p), "total_sec": p.total_sec} for p in preds],
+    )
+
+
 # -----------------------------------------------------------------------------
 # Models
 # -----------------------------------------------------------------------------
@@ -100,7 +168,12 @@ def list_models() -> Dict[str, List[str]]:
 def chat(req: ChatRequest) -> ChatResponse:
     try:
         # Allow front-end to omit 'model' → ChatService will use its default
-        res = service.ask(req.prompt, model=getattr(req, "model", None))
+        model = getattr(req, "model", None)
+        pred = predictor.predict(req.prompt, model).total_sec
+        with scheduler.slot(pred):
+            res = service.ask(req.prompt, model=model)
+        res.predicted_time_sec = pred
+        predictor.observe(req.prompt, res, predicted_sec=pred)
         _log_safe(mode="single", prompt=req.prompt, response=res, slot="single")
         return res
     except Exception as e:
@@ -118,7 +191,15 @@ def chat(req: ChatRequest) -> ChatResponse:
 )
 def battle(req: BattleRequest):
     try:
-        results = service.duel(req.prompt, req.model_a, req.model_b)
+        preds = [
+            predictor.predict(req.prompt, m).total_sec for m in (req.model_a, req.model_b)
+        ]
+        # Both runs are scheduled as one job: duel() runs them back to back.
+        with scheduler.slot(sum(preds)):
+            results = service.duel(req.prompt, req.model_a, req.model_b)
+        for r, p in zip(results, preds):
+            r.predicted_time_sec = p
+            predictor.observe(req.prompt, r, predicted_sec=p)
 
         # Group the two rows with the same pair_id so you can analyze later
         from uuid import uuid4
@@ -141,6 +222,15 @@ def battle(req: BattleRequest):
                 pair_id=pid,
             )
 
+        if settings.judge_online and len(results) >= 2:
+            pair = BattlePair(
+                pair_id=pid,
+                prompt=req.prompt,
+                a=results[0].model_dump(),
+                b=results[1].model_dump(),
+            )
+            _get_judge().enqueue(pair)
+
         return {"results": [r.model_dump() for r in results]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
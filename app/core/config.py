@@ -11,5 +11,15 @@ class Settings(BaseModel):
     ollama_model: str = Field(default=os.getenv("OLLAMA_MODEL", "llama3.1:8b"))
     temperature: float = Field(default=float(os.getenv("TEMPERATURE", "0.7")))
     top_p: float = Field(default=float(os.getenv("TOP_P", "0.9")))
+    # Scheduling of Ollama calls: "fifo" or "sjf" (shortest predicted job first)
+    scheduler_mode: str = Field(default=os.getenv("SCHEDULER_MODE", "fifo"))
+    scheduler_slots: int = Field(default=int(os.getenv("SCHEDULER_SLOTS", "1")))
+    # sjf only: seconds of predicted work forgiven per second spent waiting
+    scheduler_aging: float = Field(default=float(os.getenv("SCHEDULER_AGING", "0.5")))
+    # LLM-as-judge for battle pairs
+    judge_model: str = Field(default=os.getenv("JUDGE_MODEL", os.getenv("OLLAMA_MODEL", "llama3.1:8b")))
+    judge_concurrency: int = Field(default=int(os.getenv("JUDGE_CONCURRENCY", "4")))
+    # Judge each /api/battle pair in the background as it happens
+    judge_online: bool = Field(default=os.getenv("JUDGE_ONLINE", "0").lower() in ("1", "true", "yes"))
 
 settings = Settings()
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Optional, List
+from typing import Literal, Optional, List
 from pydantic import BaseModel, Field
 
 # ----- Single chat -----
@@ -20,6 +20,8 @@ class ChatResponse(BaseModel):
     output_tokens: int
     tokens_per_sec_wall: float
     tokens_per_sec_generate: float
+    # Latency the predictor expected for this run (before it started)
+    predicted_time_sec: Optional[float] = None
     raw_model_stats: Optional[dict] = None
 
 # ----- Battle mode -----
@@ -30,3 +32,18 @@ class BattleRequest(BaseModel):
 
 class BattleResponse(BaseModel):
     results: List[ChatResponse]
+
+# ----- Latency estimate -----
+class EstimateRequest(BaseModel):
+    prompt: str = Field(..., min_length=1, max_length=20000)
+    # "single" uses `model`; "battle" uses `model_a` + `model_b`
+    mode: Literal["single", "battle"] = "single"
+    model: Optional[str] = None
+    model_a: Optional[str] = None
+    model_b: Optional[str] = None
+
+class EstimateResponse(BaseModel):
+    predicted_time_sec: float   # run time once started
+    eta_sec: float              # queue wait + run time, if submitted now
+    queue: dict
+    models: List[dict]          # per-model breakdown of the prediction
@@ -0,0 +1,439 @@
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import logging
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .latency_model import LatencyPredictor
+from .ollama_client import OllamaClient
+from .scheduler import Scheduler
+from ..core.config import settings
+from ..storage import gsheet_store as store
+from ..storage.gsheet_store import VERDICT_COLUMNS
+
+log = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+CACHE_PATH = DATA_DIR / "judge_cache.jsonl"
+VERDICTS_CSV = DATA_DIR / "judgements.csv"
+
+# A judge reply is one short JSON object; used instead of the judge model's
+# usual chat length when predicting how long a judge call holds a slot.
+JUDGE_REPLY_TOKENS = 64
+
+# Bump when JUDGE_PROMPT changes so old cached verdicts are not reused.
+PROMPT_VERSION = "v1"
+
+JUDGE_PROMPT = (
+    "You are an impartial judge comparing two AI assistant answers to the same user prompt. "
+    "Judge correctness first, then helpfulness and clarity. Ignore answer length and the "
+    "order in which the answers are shown. "
+    'Reply with JSON only: {"winner": "1" | "2" | "tie", "reason": "<one sentence>"}'
+)
+
+@dataclass
+class BattlePair:
+    pair_id: str
+    prompt: str
+    a: Dict[str, Any]   # logged run row for slot A
+    b: Dict[str, Any]   # logged run row for slot B
+
+
+@dataclass
+class Verdict:
+    pair_id: str
+    judge_model: str
+    model_a: str
+    model_b: str
+    winner: str          # "A" | "B" | "tie"
+    score_a: float       # 1.0 A wins, 0.5 tie, 0.0 B wins (averaged over both orders)
+    consistent: bool     # both orders agreed
+    verdict_ab: str      # raw verdict with A shown first
+    verdict_ba: str      # raw verdict with B shown first, mapped back to A/B
+    judge_time_sec: float
+    cached: bool
+
+
+def pairs_from_rows(rows: Iterable[Dict[str, Any]]) -> List[BattlePair]:
+    """Group logged battle rows into A/B pairs by pair_id (incomplete pairs are dropped)."""
+    slots: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for row in rows:
+        if row.get("mode") != "battle" or not row.get("pair_id"):
+            continue
+        slots.setdefault(str(row["pair_id"]), {})[row.get("slot", "")] = row
+    return [
+        BattlePair(pair_id=pid, prompt=str(s["A"].get("prompt", "")), a=s["A"], b=s["B"])
+        for pid, s in slots.items()
+        if "A" in s and "B" in s
+    ]
+
+
+def _parse_winner(text: str) -> Optional[str]:
+    """Return "1", "2" or "tie" from the judge reply, None if it can't be parsed."""
+    m = re.search(r"\{.*\}", text, re.S)
+    if m:
+        try:
+            w = str(json.loads(m.group(0)).get("winner", "")).strip().lower()
+            if w in ("1", "2", "tie"):
+                return w
+        except ValueError:
+            pass
+    m = re.search(r"winner\W+(1|2|tie)", text, re.I)
+    return m.group(1).lower() if m else None
+
+
+class VerdictCache:
+    """Append-only JSONL cache of single judge calls keyed by content hash."""
+
+    def __init__(self, path: Path = CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data: Dict[str, str] = {}
+        if path.exists():
+            with path.open(encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                        self._data[rec["key"]] = rec["winner"]
+                    except (ValueError, KeyError):
+                        continue  # partial line from an interrupted run
+
+    @staticmethod
+    def key(judge_model: str, prompt: str, first: str, second: str) -> str:
+        blob = json.dumps([PROMPT_VERSION, judge_model, prompt, first, second])
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        return self._data.get(key)
+
+    def put(self, key: str, winner: str) -> None:
+        with self._lock:
+            self._data[key] = winner
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": key, "winner": winner}) + "\n")
+
+
+class JudgeService:
+    """
+    LLM-as-judge for battle pairs.
+
+    Each pair is judged twice, A-first and B-first, to cancel position bias.
+    All calls go through one bounded thread pool so many pairs are in flight
+    at once; single calls are cached by content hash, so re-judging (or
+    resuming an interrupted run) only pays for calls that never finished.
+
+    Pass the app's `scheduler` to run judge calls as background work: they
+    share its slots and only start when no user request is waiting. Online
+    pairs are handed over with `enqueue()`, which never blocks the caller.
+    """
+
+    def __init__(
+        self,
+        client: OllamaClient | None = None,
+        judge_model: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        cache: VerdictCache | None = None,
+        scheduler: Scheduler | None = None,
+        predictor: LatencyPredictor | None = None,
+    ):
+        self.client = client or OllamaClient()
+        self.judge_model = judge_model or settings.judge_model
+        self.cache = cache or VerdictCache()
+        self.scheduler = scheduler
+        self.predictor = predictor
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(1, concurrency or settings.judge_concurrency),
+            thread_name_prefix="judge",
+        )
+        self._lock = threading.Lock()
+        self._pairs = 0
+        self._calls = 0
+        self._cache_hits = 0
+        self._invalid = 0
+        self._failed = 0
+        # Wall time with at least one batch in flight (overlapping batches count once).
+        self._busy_sec = 0.0
+        self._active = 0
+        self._busy_since = 0.0
+        # Online pairs: drained by one recorder thread, started on first enqueue().
+        self._queue: "queue.Queue[BattlePair]" = queue.Queue()
+        self._recorder: Optional[threading.Thread] = None
+
+    # ---------- single call ----------
+    def _chat(self, user: str) -> Dict[str, Any]:
+        if self.scheduler is None:
+            return self.client.chat(JUDGE_PROMPT, user, model=self.judge_model, temperature=0.0)
+        pred = 0.0
+        if self.predictor:
+            pred = self.predictor.predict(
+                user, self.judge_model, max_output_tokens=JUDGE_REPLY_TOKENS
+            ).total_sec
+        with self.scheduler.slot(pred, background=True):
+            return self.client.chat(JUDGE_PROMPT, user, model=self.judge_model, temperature=0.0)
+
+    def _judge_once(self, prompt: str, first: str, second: str) -> tuple[Optional[str], bool, float]:
+        """Return (winner "1"/"2"/"tie" or None if unparseable, cached, seconds)."""
+        key = VerdictCache.key(self.judge_model, prompt, first, second)
+        hit = self.cache.get(key)
+        if hit is not None:
+            with self._lock:
+                self._cache_hits += 1
+            return hit, True, 0.0
+
+        t0 = time.perf_counter()
+        user = f"[User prompt]\n{prompt}\n\n[Answer 1]\n{first}\n\n[Answer 2]\n{second}"
+        data = self._chat(user)
+        winner = _parse_winner(data.get("message", {}).get("content", ""))
+        if winner is not None:
+            # Unparseable replies are not cached so a later run retries them.
+            self.cache.put(key, winner)
+        with self._lock:
+            self._calls += 1
+        return winner, False, time.perf_counter() - t0
+
+    def _combine(self, pair: BattlePair, ab: tuple, ba: tuple) -> Verdict:
+        v_ab = {"1": "A", "2": "B", "tie": "tie"}[ab[0]]
+        v_ba = {"1": "B", "2": "A", "tie": "tie"}[ba[0]]  # B was shown first
+        points = {"A": 1.0, "tie": 0.5, "B": 0.0}
+        score = (points[v_ab] + points[v_ba]) / 2
+        return Verdict(
+            pair_id=pair.pair_id,
+            judge_model=self.judge_model,
+            model_a=str(pair.a.get("model", "")),
+            model_b=str(pair.b.get("model", "")),
+            winner="A" if score > 0.5 else "B" if score < 0.5 else "tie",
+            score_a=score,
+            consistent=v_ab == v_ba,
+            verdict_ab=v_ab,
+            verdict_ba=v_ba,
+            judge_time_sec=round(ab[2] + ba[2], 3),
+            cached=ab[1] and ba[1],
+        )
+
+    # ---------- batches ----------
+    def iter_verdicts(self, pairs: Iterable[BattlePair]) -> Iterator[tuple[BattlePair, Verdict]]:
+        """
+        Submit both orderings of every pair up front, then yield verdicts in
+        input order. The pool bounds how many calls hit Ollama at once.
+
+        Pairs whose judge call failed or could not be parsed are logged,
+        counted and skipped (not yielded), so a later run retries them.
+        """
+        self._busy_enter()
+        inflight: List[tuple[BattlePair, Future, Future]] = []
+        for p in pairs:
+            a, b = str(p.a.get("content", "")), str(p.b.get("content", ""))
+            inflight.append((
+                p,
+                self._pool.submit(self._judge_once, p.prompt, a, b),
+                self._pool.submit(self._judge_once, p.prompt, b, a),
+            ))
+        try:
+            for pair, f_ab, f_ba in inflight:
+                try:
+                    ab, ba = f_ab.result(), f_ba.result()
+                except Exception as e:
+                    log.warning("Judge call failed for pair %s: %s", pair.pair_id, e)
+                    with self._lock:
+                        self._failed += 1
+                    continue
+                if ab[0] is None or ba[0] is None:
+                    log.warning("Unparseable judge reply for pair %s", pair.pair_id)
+                    with self._lock:
+                        self._invalid += 1
+                    continue
+                with self._lock:
+                    self._pairs += 1
+                yield pair, self._combine(pair, ab, ba)
+        finally:
+            for _, f_ab, f_ba in inflight:
+                f_ab.cancel()
+                f_ba.cancel()
+            self._busy_exit()
+
+    def _busy_enter(self) -> None:
+        with self._lock:
+            if self._active == 0:
+                self._busy_since = time.perf_counter()
+            self._active += 1
+
+    def _busy_exit(self) -> None:
+        with self._lock:
+            self._active -= 1
+            if self._active == 0:
+                self._busy_sec += time.perf_counter() - self._busy_since
+
+    def judge_pairs(self, pairs: Iterable[BattlePair]) -> List[Verdict]:
+        return [v for _, v in self.iter_verdicts(pairs)]
+
+    # ---------- online ----------
+    def enqueue(self, pair: BattlePair) -> None:
+        """Queue a pair for background judging and return immediately."""
+        with self._lock:
+            if self._recorder is None:
+                self._recorder = threading.Thread(
+                    target=self._record_loop, name="judge-recorder", daemon=True
+                )
+                self._recorder.start()
+        self._queue.put(pair)
+
+    def _record_loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            # Take everything that queued up meanwhile so those pairs run in parallel.
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                judge_and_record(self, batch, skip_judged=False)
+            except Exception as e:
+                log.warning("Online judging failed for %d pair(s): %s", len(batch), e)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            busy = self._busy_sec
+            if self._active:
+                busy += time.perf_counter() - self._busy_since
+            return {
+                "judge_model": self.judge_model,
+                "pairs_judged": self._pairs,
+                "judge_calls": self._calls,
+                "cache_hits": self._cache_hits,
+                "invalid_replies": self._invalid,
+                "failed_pairs": self._failed,
+                "queued": self._queue.qsize(),
+                "pairs_per_sec": round(self._pairs / busy, 2) if busy else 0.0,
+            }
+
+
+# -----------------------------------------------------------------------------
+# Recording: next to the run log (Google Sheets), CSV fallback
+# -----------------------------------------------------------------------------
+def verdict_row(v: Verdict, pair: BattlePair) -> List[str]:
+    ts = datetime.utcnow().isoformat(timespec="seconds") + "Z"
+    d = asdict(v)
+    d.update(
+        ts_iso=ts,
+        prompt=pair.prompt,
+        wall_time_sec_a=pair.a.get("wall_time_sec", ""),
+        wall_time_sec_b=pair.b.get("wall_time_sec", ""),
+        tokens_per_sec_generate_a=pair.a.get("tokens_per_sec_generate", ""),
+        tokens_per_sec_generate_b=pair.b.get("tokens_per_sec_generate", ""),
+        output_tokens_a=pair.a.get("output_tokens", ""),
+        output_tokens_b=pair.b.get("output_tokens", ""),
+    )
+    return [str(d[c]) for c in VERDICT_COLUMNS]
+
+
+def record_verdicts(rows: List[List[str]]) -> str:
+    """Append verdict rows in one write. Returns where they went."""
+    if not rows:
+        return "none"
+    try:
+        store.log_verdicts(rows)
+        return "google_sheets"
+    except Exception as e:
+        log.warning("Sheets unavailable, writing %s: %s", VERDICTS_CSV.name, e)
+    new = not VERDICTS_CSV.exists()
+    VERDICTS_CSV.parent.mkdir(parents=True, exist_ok=True)
+    with VERDICTS_CSV.open("a", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        if new:
+            w.writerow(VERDICT_COLUMNS)
+        w.writerows(rows)
+    return "csv"
+
+
+def judged_pair_ids(judge_model: str) -> set[str]:
+    """pair_ids that already have a verdict from this judge (for resuming)."""
+    try:
+        rows = store.read_verdicts()
+    except Exception:
+        rows = []
+        if VERDICTS_CSV.exists():
+            with VERDICTS_CSV.open(newline="", encoding="utf-8") as f:
+                rows = list(csv.DictReader(f))
+    return {str(r["pair_id"]) for r in rows if r.get("judge_model") == judge_model}
+
+
+def judge_and_record(
+    judge: JudgeService,
+    pairs: List[BattlePair],
+    batch_size: int = 32,
+    skip_judged: bool = True,
+    limit: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Judge pairs and record verdicts in batches. Returns a throughput summary.
+    `limit` caps the pairs judged this run, counted after already judged ones are skipped.
+    """
+    if skip_judged:
+        done = judged_pair_ids(judge.judge_model)
+        pairs = [p for p in pairs if p.pair_id not in done]
+    if limit is not None:
+        pairs = pairs[:limit]
+
+    t0 = time.perf_counter()
+    judged, sink, rows = 0, "none", []
+    # Record every `batch_size` verdicts so an interrupted run keeps its progress.
+    try:
+        for pair, v in judge.iter_verdicts(pairs):
+            rows.append(verdict_row(v, pair))
+            if len(rows) >= batch_size:
+                sink = record_verdicts(rows)
+                judged, rows = judged + len(rows), []
+    finally:
+        if rows:
+            sink = record_verdicts(rows)
+            judged += len(rows)
+
+    elapsed = time.perf_counter() - t0
+    return {
+        "pairs_judged": judged,
+        "elapsed_sec": round(elapsed, 3),
+        "pairs_per_sec": round(judged / elapsed, 2) if elapsed > 0 else 0.0,
+        "recorded_to": sink,
+    }
+
+
+if __name__ == "__main__":
+    # Offline run over the run log:  python -m app.services.judge_service [--csv path]
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Judge logged battle pairs with an LLM.")
+    ap.add_argument("--csv", help="read runs from this CSV instead of Google Sheets")
+    ap.add_argument("--judge-model", default=None)
+    ap.add_argument("--concurrency", type=int, default=None)
+    ap.add_argument("--batch-size", type=int, default=32)
+    ap.add_argument("--limit", type=int, default=None)
+    ap.add_argument("--rejudge", action="store_true", help="also re-record already judged pairs")
+    args = ap.parse_args()
+
+    if args.csv:
+        with open(args.csv, newline="", encoding="utf-8") as f:
+            runs = list(csv.DictReader(f))
+    else:
+        runs = store.read_rows()
+
+    svc = JudgeService(judge_model=args.judge_model, concurrency=args.concurrency)
+    summary = judge_and_record(
+        svc,
+        pairs_from_rows(runs),
+        batch_size=args.batch_size,
+        skip_judged=not args.rejudge,
+        limit=args.limit,
+    )
+    print(json.dumps({**summary, **svc.stats()}, indent=2))
@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from ..core.config import settings
+
+# Ollama keeps a model resident for 5 minutes by default; after that the next
+# call pays the cold-load cost again.
+KEEP_ALIVE_SEC = 300.0
+# load_duration above this is treated as a cold load (weights read from disk).
+COLD_LOAD_THRESHOLD_SEC = 1.0
+# Rough chars-per-token used until prompt history supports a regression.
+DEFAULT_CHARS_PER_TOKEN = 4.0
+# Last-resort prior when no model has any history yet (a mid-size model on a GPU).
+DEFAULT_PROMPT_SEC_PER_TOKEN = 1 / 100.0
+DEFAULT_GENERATE_SEC_PER_TOKEN = 1 / 20.0
+DEFAULT_OUTPUT_TOKENS = 256.0
+DEFAULT_COLD_LOAD_SEC = 3.0
+
+
+def _num(v: Any) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class LinearFit:
+    """
+    Least-squares fit y = a + b*x kept as running sums, so it can be updated
+    one observation at a time or refit from whole columns in one pass.
+    """
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.sx = self.sy = self.sxx = self.sxy = 0.0
+
+    def add(self, x: float, y: float) -> None:
+        self.n += 1
+        self.sx += x
+        self.sy += y
+        self.sxx += x * x
+        self.sxy += x * y
+
+    def merge(self, other: "LinearFit") -> None:
+        self.n += other.n
+        self.sx += other.sx
+        self.sy += other.sy
+        self.sxx += other.sxx
+        self.sxy += other.sxy
+
+    def add_many(self, xs: List[float], ys: List[float]) -> None:
+        self.n += len(xs)
+        self.sx += sum(xs)
+        self.sy += sum(ys)
+        self.sxx += sum(x * x for x in xs)
+        self.sxy += sum(x * y for x, y in zip(xs, ys))
+
+    @property
+    def has_slope(self) -> bool:
+        """True once there is enough spread in x for a real regression line."""
+        return self.n >= 3 and self.n * self.sxx - self.sx * self.sx > 1e-9
+
+    def coef(self) -> tuple[float, float]:
+        """Return (intercept, slope). Falls back to a ratio through the origin."""
+        if self.n == 0:
+            return 0.0, 0.0
+        if self.has_slope:
+            det = self.n * self.sxx - self.sx * self.sx
+            b = (self.n * self.sxy - self.sx * self.sy) / det
+            a = (self.sy - b * self.sx) / self.n
+            if a >= 0 and b >= 0:
+                return a, b
+        return 0.0, (self.sy / self.sx) if self.sx > 0 else 0.0
+
+    def predict(self, x: float) -> float:
+        a, b = self.coef()
+        return max(0.0, a + b * x)
+
+
+class Mean:
+    def __init__(self) -> None:
+        self.n = 0
+        self.total = 0.0
+
+    def add(self, v: float) -> None:
+        self.n += 1
+        self.total += v
+
+    def merge(self, other: "Mean") -> None:
+        self.n += other.n
+        self.total += other.total
+
+    @property
+    def value(self) -> float:
+        return self.total / self.n if self.n else 0.0
+
+
+@dataclass
+class ModelStats:
+    """Fitted latency parameters for one model."""
+    prompt_tokens: LinearFit = field(default_factory=LinearFit)    # chars  -> tokens
+    prompt_eval: LinearFit = field(default_factory=LinearFit)      # tokens -> sec
+    generate: LinearFit = field(default_factory=LinearFit)         # tokens -> sec
+    output_tokens: Mean = field(default_factory=Mean)
+    cold_load: Mean = field(default_factory=Mean)
+    warm_load: Mean = field(default_factory=Mean)
+    # prediction error, only for runs that were predicted in this process
+    abs_err: Mean = field(default_factory=Mean)
+    abs_pct_err: Mean = field(default_factory=Mean)
+
+
+@dataclass
+class Prediction:
+    model: str
+    prompt_tokens: int
+    output_tokens: int
+    load_sec: float
+    prompt_eval_sec: float
+    eval_sec: float
+    samples: int
+
+    @property
+    def total_sec(self) -> float:
+        return round(self.load_sec + self.prompt_eval_sec + self.eval_sec, 3)
+
+
+class LatencyPredictor:
+    """
+    Per-model latency model fitted from logged runs.
+
+    duration = load + prompt_tokens * prompt_eval_rate + output_tokens * generation_rate
+
+    Parameters are refit from history on first use and then updated
+    incrementally with every completed run. Models without history are
+    predicted from all known models pooled together.
+    """
+
+    def __init__(self, history_loader: Optional[Callable[[], Iterable[Dict[str, Any]]]] = None):
+        self._loader = history_loader
+        self._loaded = history_loader is None
+        self._stats: Dict[str, ModelStats] = {}
+        self._last_used: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        # Held for the whole history fetch so early requests wait for the fit.
+        self._load_lock = threading.Lock()
+
+    # ---------- fitting ----------
+    def fit_rows(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Refit from logged rows (store/CSV dicts), replacing current fits. Returns rows used."""
+        cols: Dict[str, Dict[str, List[float]]] = {}
+        for row in rows:
+            model = row.get("model")
+            if not model:
+                continue
+            c = cols.setdefault(model, {k: [] for k in (
+                "chars", "ptok", "peval", "otok", "eval", "load",
+            )})
+            c["chars"].append(float(len(str(row.get("prompt", "")))))
+            c["ptok"].append(_num(row.get("prompt_tokens")))
+            c["peval"].append(_num(row.get("prompt_eval_time_sec")))
+            c["otok"].append(_num(row.get("output_tokens")))
+            c["eval"].append(_num(row.get("eval_time_sec")))
+            c["load"].append(_num(row.get("load_time_sec")))
+
+        used = 0
+        with self._lock:
+            self._stats = {}
+            for model, c in cols.items():
+                st = self._stats.setdefault(model, ModelStats())
+                st.prompt_tokens.add_many(c["chars"], c["ptok"])
+                st.prompt_eval.add_many(c["ptok"], c["peval"])
+                st.generate.add_many(c["otok"], c["eval"])
+                for v in c["otok"]:
+                    st.output_tokens.add(v)
+                for v in c["load"]:
+                    (st.cold_load if v >= COLD_LOAD_THRESHOLD_SEC else st.warm_load).add(v)
+                used += len(c["chars"])
+        return used
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            try:
+                self.fit_rows(self._loader())
+            except Exception as e:  # pragma: no cover
+                print(f"[latency] history not loaded: {e}")
+            self._loaded = True
+
+    def observe(self, prompt: str, response: Any, predicted_sec: Optional[float] = None) -> None:
+        """Fold one completed run (a ChatResponse) into the model."""
+        self._ensure_loaded()
+        with self._lock:
+            st = self._stats.setdefault(response.model, ModelStats())
+            st.prompt_tokens.add(float(len(prompt)), float(response.prompt_tokens))
+            st.prompt_eval.add(float(response.prompt_tokens), response.prompt_eval_time_sec)
+            st.generate.add(float(response.output_tokens), response.eval_time_sec)
+            st.output_tokens.add(float(response.output_tokens))
+            load = response.load_time_sec
+            (st.cold_load if load >= COLD_LOAD_THRESHOLD_SEC else st.warm_load).add(load)
+            self._last_used[response.model] = time.monotonic()
+
+            if predicted_sec is not None:
+                actual = response.total_time_sec or response.wall_time_sec
+                err = abs(predicted_sec - actual)
+                st.abs_err.add(err)
+                if actual > 0:
+                    st.abs_pct_err.add(100.0 * err / actual)
+
+    # ---------- prediction ----------
+    def _pooled(self) -> ModelStats:
+        """Prior for a model without history: all known models' data pooled (lock held)."""
+        pooled = ModelStats()
+        for st in self._stats.values():
+            pooled.prompt_tokens.merge(st.prompt_tokens)
+            pooled.prompt_eval.merge(st.prompt_eval)
+            pooled.generate.merge(st.generate)
+            pooled.output_tokens.merge(st.output_tokens)
+            pooled.cold_load.merge(st.cold_load)
+            pooled.warm_load.merge(st.warm_load)
+        return pooled
+
+    def predict(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        max_output_tokens: Optional[int] = None,
+    ) -> Prediction:
+        """`max_output_tokens` caps the expected reply length (e.g. short judge verdicts)."""
+        self._ensure_loaded()
+        model = model or settings.ollama_model
+        with self._lock:
+            st = self._stats.get(model)
+            samples = st.generate.n if st else 0
+            if not samples:
+                st = self._pooled()
+            last = self._last_used.get(model)
+
+            # A ratio from a few short prompts mostly measures the chat template
+            # overhead, so it is only trusted once it is a proper regression.
+            if st.prompt_tokens.has_slope:
+                p_tok = st.prompt_tokens.predict(float(len(prompt)))
+            else:
+                p_tok = len(prompt) / DEFAULT_CHARS_PER_TOKEN
+            o_tok = st.output_tokens.value if st.output_tokens.n else DEFAULT_OUTPUT_TOKENS
+            if max_output_tokens is not None:
+                o_tok = min(o_tok, float(max_output_tokens))
+
+            if st.prompt_eval.n:
+                p_sec = st.prompt_eval.predict(p_tok)
+            else:
+                p_sec = p_tok * DEFAULT_PROMPT_SEC_PER_TOKEN
+            if st.generate.n:
+                g_sec = st.generate.predict(o_tok)
+            else:
+                g_sec = o_tok * DEFAULT_GENERATE_SEC_PER_TOKEN
+
+            warm = last is not None and (time.monotonic() - last) < KEEP_ALIVE_SEC
+            if warm:
+                load = st.warm_load.value
+            elif st.cold_load.n:
+                load = st.cold_load.value
+            elif st.warm_load.n:
+                load = st.warm_load.value
+            else:
+                load = DEFAULT_COLD_LOAD_SEC
+
+            return Prediction(
+                model=model,
+                prompt_tokens=int(round(p_tok)),
+                output_tokens=int(round(o_tok)),
+                load_sec=round(load, 3),
+                prompt_eval_sec=round(p_sec, 3),
+                eval_sec=round(g_sec, 3),
+                samples=samples,
+            )
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Fitted parameters and prediction error per model."""
+        self._ensure_loaded()
+        out: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for model, st in self._stats.items():
+                _, p_rate = st.prompt_eval.coef()
+                _, g_rate = st.generate.coef()
+                out[model] = {
+                    "samples": st.generate.n,
+                    "prompt_tokens_per_sec": round(1.0 / p_rate, 2) if p_rate > 0 else None,
+                    "generate_tokens_per_sec": round(1.0 / g_rate, 2) if g_rate > 0 else None,
+                    "cold_load_sec": round(st.cold_load.value, 3),
+                    "warm_load_sec": round(st.warm_load.value, 3),
+                    "mean_output_tokens": round(st.output_tokens.value, 1),
+                    "predicted_runs": st.abs_err.n,
+                    "mean_abs_error_sec": round(st.abs_err.value, 3),
+                    "mean_abs_pct_error": round(st.abs_pct_err.value, 1),
+                }
+        return out
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator, List, Literal, Optional
+
+from ..core.config import settings
+
+Mode = Literal["fifo", "sjf"]
+
+
+@dataclass
+class _Ticket:
+    seq: int
+    predicted_sec: float
+    background: bool = False
+    enqueued: float = field(default_factory=time.monotonic)
+    started: float = 0.0
+
+
+class Scheduler:
+    """
+    Gate for Ollama calls. At most `slots` runs execute at once; the rest wait.
+
+    - fifo: waiting runs start in arrival order.
+    - sjf:  the run with the smallest predicted duration starts first. Every
+            second spent waiting subtracts `aging` seconds from a run's score,
+            so a long prompt cannot be starved by a stream of short ones.
+
+    Background runs (e.g. online judging) only start when no foreground run
+    is waiting, in either mode.
+    """
+
+    def __init__(
+        self,
+        mode: Optional[Mode] = None,
+        slots: Optional[int] = None,
+        aging: Optional[float] = None,
+    ):
+        mode = (mode or settings.scheduler_mode).strip().lower()
+        if mode not in ("fifo", "sjf"):
+            raise ValueError(f"Unknown scheduler mode {mode!r}; expected 'fifo' or 'sjf'.")
+        self.mode: Mode = mode  # type: ignore[assignment]
+        self.slots = max(1, slots or settings.scheduler_slots)
+        self.aging = settings.scheduler_aging if aging is None else aging
+        self._cond = threading.Condition()
+        self._waiting: List[_Ticket] = []
+        self._running: List[_Ticket] = []
+        self._seq = itertools.count()
+
+    def _score(self, t: _Ticket, now: float) -> float:
+        if self.mode == "sjf":
+            return t.predicted_sec - self.aging * (now - t.enqueued)
+        return float(t.seq)
+
+    def _ordered(self) -> List[_Ticket]:
+        now = time.monotonic()
+        return sorted(self._waiting, key=lambda t: (t.background, self._score(t, now), t.seq))
+
+    def _remaining(self, now: float) -> List[float]:
+        return sorted(max(0.0, t.predicted_sec - (now - t.started)) for t in self._running)
+
+    def eta(self, predicted_sec: float) -> float:
+        """
+        Seconds until a new run of `predicted_sec` would finish if submitted now.
+        Simulates the queue with the current predictions (aging is ignored).
+        """
+        with self._cond:
+            now = time.monotonic()
+            free = self._remaining(now)
+            free = [0.0] * (self.slots - len(free)) + free
+            ahead = [t for t in self._ordered() if not t.background]
+            if self.mode == "sjf":
+                ahead = [t for t in ahead if t.predicted_sec <= predicted_sec]
+            for t in ahead:
+                free.sort()
+                free[0] += t.predicted_sec
+            free.sort()
+            return round(free[0] + predicted_sec, 3)
+
+    @contextmanager
+    def slot(self, predicted_sec: float, background: bool = False) -> Iterator[None]:
+        """Block until this run is scheduled, hold a slot while the body runs."""
+        ticket = _Ticket(seq=next(self._seq), predicted_sec=predicted_sec, background=background)
+        with self._cond:
+            self._waiting.append(ticket)
+            while not (len(self._running) < self.slots and self._ordered()[0] is ticket):
+                # Timed wait so aged scores are re-evaluated even without notify.
+                self._cond.wait(timeout=1.0)
+            self._waiting.remove(ticket)
+            ticket.started = time.monotonic()
+            self._running.append(ticket)
+            self._cond.notify_all()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._running.remove(ticket)
+                self._cond.notify_all()
+
+    def status(self) -> dict:
+        with self._cond:
+            return {
+                "mode": self.mode,
+                "slots": self.slots,
+                "running": len(self._running),
+                "waiting": len(self._waiting),
+            }
@@ -69,6 +69,7 @@ function setSingleMetrics(d = {}) {
   set('m-otok', d.output_tokens);
   set('m-tpsw', d.tokens_per_sec_wall);
   set('m-tpsg', d.tokens_per_sec_generate);
+  set('m-pred', d.predicted_time_sec);
 }
 
 function fillMetricsTable(tbody, d = {}) {
@@ -84,6 +85,7 @@ function fillMetricsTable(tbody, d = {}) {
     <tr><th>Output tokens</th><td>${d.output_tokens ?? '–'}</td></tr>
     <tr><th>Tok/s (wall)</th><td>${d.tokens_per_sec_wall ?? '–'}</td></tr>
     <tr><th>Tok/s (generate)</th><td>${d.tokens_per_sec_generate ?? '–'}</td></tr>
+    <tr><th>Predicted (s)</th><td>${d.predicted_time_sec ?? '–'}</td></tr>
   `;
 }
 
@@ -131,6 +133,18 @@ async function speakServer(text) {
 }
 function speak(text){ return USE_SERVER_TTS ? speakServer(text) : speakClient(text); }
 
+// ETA (best effort; fired alongside the actual request, never awaited)
+function showEta(body) {
+  fetch('/api/estimate', { method:'POST', headers:{'Content-Type':'application/json'}, body:JSON.stringify(body) })
+    .then(r => r.ok ? r.json() : null)
+    .then(d => {
+      if (d?.eta_sec != null && statusEl.textContent.startsWith('Thinking')) {
+        statusEl.textContent = `Thinking... (ETA ~${d.eta_sec.toFixed(1)}s)`;
+      }
+    })
+    .catch(() => {});
+}
+
 btnSpeakSingle?.addEventListener('click', () => speak(respEl?.textContent || ''));
 btnSpeakA?.addEventListener('click', () => speak(respA?.textContent || ''));
 btnSpeakB?.addEventListener('click', () => speak(respB?.textContent || ''));
@@ -152,6 +166,7 @@ form.addEventListener('submit', async (e) => {
   try {
     if (currentMode() === 'single') {
       const model = modelEl?.value;
+      showEta({ prompt, mode: 'single', model });
       const r = await fetch('/api/chat', {
         method:'POST', headers:{'Content-Type':'application/json'},
         body: JSON.stringify({ prompt, model })
@@ -165,6 +180,7 @@ form.addEventListener('submit', async (e) => {
     } else {
       const model_a = modelAEl?.value;
       const model_b = modelBEl?.value;
+      showEta({ prompt, mode: 'battle', model_a, model_b });
       const r = await fetch('/api/battle', {
         method:'POST', headers:{'Content-Type':'application/json'},
         body: JSON.stringify({ prompt, model_a, model_b })
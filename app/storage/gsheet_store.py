@@ -25,6 +25,7 @@ _SCOPES = [
 
 _SHEET_ID = os.getenv("GSPREAD_SHEET_ID")
 _WS_NAME = os.getenv("GSPREAD_WORKSHEET", "runs")
+_JUDGE_WS_NAME = os.getenv("GSPREAD_JUDGE_WORKSHEET", "judgements")
 
 COLUMNS = [
     "ts_iso", "mode", "pair_id", "slot",
@@ -35,8 +36,18 @@ COLUMNS = [
     "tokens_per_sec_wall", "tokens_per_sec_generate",
 ]
 
+# LLM-as-judge verdicts, one row per judged battle pair (joined to runs by pair_id)
+VERDICT_COLUMNS = [
+    "ts_iso", "pair_id", "judge_model", "prompt",
+    "model_a", "model_b", "winner", "score_a", "consistent",
+    "verdict_ab", "verdict_ba", "judge_time_sec", "cached",
+    "wall_time_sec_a", "wall_time_sec_b",
+    "tokens_per_sec_generate_a", "tokens_per_sec_generate_b",
+    "output_tokens_a", "output_tokens_b",
+]
+
 _client: gspread.Client | None = None
-_ws: gspread.Worksheet | None = None
+_worksheets: dict[str, gspread.Worksheet] = {}
 
 
 def _get_credentials() -> Credentials:
@@ -52,31 +63,35 @@ def _get_credentials() -> Credentials:
     )
 
 
-def _get_ws() -> gspread.Worksheet:
-    global _client, _ws
-    if _ws is not None:
-        return _ws
+def _open_ws(name: str, columns: list[str]) -> gspread.Worksheet:
+    global _client
+    if name in _worksheets:
+        return _worksheets[name]
     if not _SHEET_ID:
         raise RuntimeError("GSPREAD_SHEET_ID not set.")
 
-    creds = _get_credentials()
-    _client = gspread.authorize(creds)
+    if _client is None:
+        _client = gspread.authorize(_get_credentials())
     sh = _client.open_by_key(_SHEET_ID)
 
     # create or get worksheet
     try:
-        ws = sh.worksheet(_WS_NAME)
+        ws = sh.worksheet(name)
     except gspread.exceptions.WorksheetNotFound:
-        ws = sh.add_worksheet(title=_WS_NAME, rows=1000, cols=len(COLUMNS))
+        ws = sh.add_worksheet(title=name, rows=1000, cols=len(columns))
 
     # ensure header row
     header = ws.row_values(1)
-    if header != COLUMNS:
+    if header != columns:
         ws.clear()
-        ws.update("A1", [COLUMNS])
+        ws.update("A1", [columns])
 
-    _ws = ws
-    return _ws
+    _worksheets[name] = ws
+    return ws
+
+
+def _get_ws() -> gspread.Worksheet:
+    return _open_ws(_WS_NAME, COLUMNS)
 
 
 @backoff.on_exception(backoff.expo, (gspread.exceptions.APIError,), max_time=60)
@@ -115,4 +130,33 @@ def log_row(
         str(response.tokens_per_sec_wall),
         str(response.tokens_per_sec_generate),
     ]
-    _append(v)
\ No newline at end of file
+    _append(v)
+
+
+def read_rows() -> list[dict]:
+    """
+    Return all logged runs as dicts keyed by COLUMNS (used to fit the latency model).
+    Values are left as text (e.g. hex pair_ids like "1234e5678901"); callers convert.
+    """
+    ws = _get_ws()
+    return ws.get_all_records(expected_headers=COLUMNS, numericise_ignore=["all"])
+
+
+# === LLM-as-judge verdicts (separate tab, keyed by pair_id) ===
+def _get_judge_ws() -> gspread.Worksheet:
+    return _open_ws(_JUDGE_WS_NAME, VERDICT_COLUMNS)
+
+
+@backoff.on_exception(backoff.expo, (gspread.exceptions.APIError,), max_time=60)
+def log_verdicts(rows: list[list[str]]) -> None:
+    """
+    Append a batch of judge verdicts (one API call for the whole batch).
+    """
+    ws = _get_judge_ws()
+    ws.append_rows(rows, value_input_option="RAW", table_range="A1")
+
+
+def read_verdicts() -> list[dict]:
+    return _get_judge_ws().get_all_records(
+        expected_headers=VERDICT_COLUMNS, numericise_ignore=["all"]
+    )